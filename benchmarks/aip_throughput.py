@@ -0,0 +1,90 @@
+"""Measure the throughput of building METS from a directory scan.
+
+Generates a directory tree, then times hashing it with a thread pool and
+a process pool, and times aip.create_mets_file end to end:
+
+    python benchmarks/aip_throughput.py --files 20000 --size 65536
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+
+from pymets import aip
+
+
+def generate_tree(directory, files, size, files_per_directory=100):
+    """Write files of random bytes spread over nested directories."""
+    for i in range(files):
+        subdirectory = os.path.join(
+            directory, 'd%03d' % (i // (files_per_directory * 10)),
+            'd%03d' % (i // files_per_directory))
+        os.makedirs(subdirectory, exist_ok=True)
+        with open(os.path.join(subdirectory, 'f%06d.tif' % (i,)), 'wb') as f:
+            f.write(os.urandom(size))
+
+
+def time_hashing(directory, executor_class, workers):
+    """Return the seconds taken to hash every file with an executor, using
+    the same chunked tasks as aip.hash_directory.
+    """
+    relative_paths = [
+        relative_path for relative_path, size, mtime_ns in aip.scan_directory(directory)]
+    chunks = [relative_paths[i:i + aip.HASH_CHUNK_SIZE]
+              for i in range(0, len(relative_paths), aip.HASH_CHUNK_SIZE)]
+    start = time.perf_counter()
+    with executor_class(max_workers=workers) as executor:
+        for checksums in executor.map(aip._hash_files, repeat(directory), chunks,
+                                      repeat('MD5')):
+            pass
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=20000)
+    parser.add_argument('--size', type=int, default=65536, help='bytes per file')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        tree = os.path.join(directory, 'tree')
+        generate_tree(tree, args.files, args.size)
+        megabytes = args.files * args.size / 1e6
+
+        start = time.perf_counter()
+        scanned = sum(1 for scanned in aip.scan_directory(tree))
+        elapsed = time.perf_counter() - start
+        print('scan           %8.0f files/s' % (scanned / elapsed,))
+
+        for name, executor_class in (('threads', ThreadPoolExecutor),
+                                     ('processes', ProcessPoolExecutor)):
+            elapsed = time_hashing(tree, executor_class, args.workers)
+            print('hash %-9s %8.0f files/s %8.1f MB/s' % (
+                name, args.files / elapsed, megabytes / elapsed))
+
+        mets_filename = os.path.join(directory, 'mets.xml')
+        start = time.perf_counter()
+        aip.create_mets_file(tree, mets_filename, workers=args.workers)
+        elapsed = time.perf_counter() - start
+        print('create_mets_file %6.0f files/s %8.1f MB/s' % (
+            args.files / elapsed, megabytes / elapsed))
+
+        checkpoint_filename = os.path.join(directory, 'checkpoint.jsonl')
+        aip.create_mets_file(tree, mets_filename, workers=args.workers,
+                             checkpoint_filename=checkpoint_filename)
+        start = time.perf_counter()
+        aip.create_mets_file(tree, mets_filename, workers=args.workers,
+                             checkpoint_filename=checkpoint_filename)
+        elapsed = time.perf_counter() - start
+        print('resumed run    %8.0f files/s' % (args.files / elapsed,))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Measure the build rate and query latency of a CorpusIndex.
+
+Generates METS documents, indexes them, re-runs the update with nothing
+changed, and times each query method:
+
+    python benchmarks/index_throughput.py --documents 2000 --files 50
+"""
+import argparse
+import hashlib
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from pymets import index
+
+STRUCT_MAP_TYPES = ('physical', 'logical', 'directory')
+
+
+def generate_documents(directory, documents, files):
+    """Write METS documents and return the checksums and hrefs used."""
+    checksums = []
+    hrefs = []
+    for i in range(documents):
+        file_elements = []
+        for j in range(files):
+            checksum = hashlib.md5(b'%d/%d' % (i, j)).hexdigest()
+            href = 'objects/%d/%d.tif' % (i, j)
+            checksums.append(checksum)
+            hrefs.append(href)
+            file_elements.append(
+                '<file ID="file_%d" CHECKSUM="%s" CHECKSUMTYPE="MD5" SIZE="1024"'
+                ' MIMETYPE="image/tiff"><FLocat LOCTYPE="URL" xlink:href="%s"/></file>'
+                % (j, checksum, href))
+        mets_string = (
+            '<mets xmlns:xlink="http://www.w3.org/1999/xlink" OBJID="ark:/67531/%d">'
+            '<metsHdr><agent ROLE="CREATOR"><name>Agent %d</name></agent></metsHdr>'
+            '<fileSec><fileGrp USE="master">%s</fileGrp></fileSec>'
+            '<structMap TYPE="%s"><div/></structMap></mets>'
+            % (i, i % 10, ''.join(file_elements), STRUCT_MAP_TYPES[i % 3]))
+        with open(os.path.join(directory, '%06d.xml' % (i,)), 'w') as f:
+            f.write(mets_string)
+    return checksums, hrefs
+
+
+def time_queries(query, values):
+    """Return the median and maximum milliseconds taken by a query."""
+    timings = []
+    for value in values:
+        start = time.perf_counter()
+        query(value)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), max(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--documents', type=int, default=2000)
+    parser.add_argument('--files', type=int, default=50, help='files per document')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        documents_directory = os.path.join(directory, 'mets')
+        os.mkdir(documents_directory)
+        checksums, hrefs = generate_documents(
+            documents_directory, args.documents, args.files)
+        mets_filenames = [os.path.join(documents_directory, name)
+                          for name in sorted(os.listdir(documents_directory))]
+
+        with index.CorpusIndex(os.path.join(directory, 'index.sqlite')) as corpus_index:
+            start = time.perf_counter()
+            corpus_index.update(mets_filenames, workers=args.workers)
+            elapsed = time.perf_counter() - start
+            print('build          %8.0f documents/s %10.0f files/s' % (
+                args.documents / elapsed, args.documents * args.files / elapsed))
+
+            start = time.perf_counter()
+            corpus_index.update(mets_filenames, workers=args.workers)
+            elapsed = time.perf_counter() - start
+            print('no-op update   %8.0f documents/s' % (args.documents / elapsed,))
+
+            queries = (
+                ('find_by_checksum', corpus_index.find_by_checksum,
+                 random.sample(checksums, args.queries)),
+                ('find_by_href', corpus_index.find_by_href,
+                 random.sample(hrefs, args.queries)),
+                ('find_by_objid', corpus_index.find_by_objid,
+                 ['ark:/67531/%d' % (random.randrange(args.documents),)
+                  for _ in range(args.queries)]),
+                ('find_by_agent_name', corpus_index.find_by_agent_name,
+                 ['Agent %d' % (i % 10,) for i in range(args.queries)]),
+                ('find_by_struct_map_type', corpus_index.find_by_struct_map_type,
+                 [STRUCT_MAP_TYPES[i % 3] for i in range(args.queries)]),
+                )
+            for name, query, values in queries:
+                median, maximum = time_queries(query, values)
+                print('%-24s median %7.3f ms  max %7.3f ms' % (name, median, maximum))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
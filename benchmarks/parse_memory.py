@@ -0,0 +1,67 @@
+"""Measure the memory held by a parsed METS document.
+
+Compares metsxml2py with and without attribute interning, and with and
+without compact_idrefs, on generated documents:
+
+    python benchmarks/parse_memory.py --files 20000
+"""
+import argparse
+import gc
+import io
+import tracemalloc
+
+from pymets import metsdoc
+
+# ADMID values for each generated file, by case name.
+ADMID_CASES = {
+    'unique single': lambda i: 'amd_%d' % (i,),
+    'shared single': lambda i: 'amd_rights',
+    'unique list': lambda i: 'amd_rights amd_%d' % (i,),
+    'shared list': lambda i: 'amd_rights amd_tech',
+    }
+
+
+def generate_mets(files, admid):
+    """Return a METS document with the given number of file elements."""
+    file_elements = ''.join(
+        '<file ID="file_%d" MIMETYPE="image/tiff" USE="archive" CHECKSUMTYPE="MD5"'
+        ' ADMID="%s"><FLocat LOCTYPE="URL" xlink:href="page/%d.tif"/></file>'
+        % (i, admid(i), i) for i in range(files))
+    return ('<mets xmlns:xlink="http://www.w3.org/1999/xlink"><fileSec><fileGrp>%s'
+            '</fileGrp></fileSec></mets>' % (file_elements,)).encode('utf-8')
+
+
+def measure(mets_bytes, **kwargs):
+    """Return the megabytes allocated and still held after parsing."""
+    gc.collect()
+    tracemalloc.start()
+    mets = metsdoc.metsxml2py(io.BytesIO(mets_bytes), **kwargs)
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del mets
+    return held / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=20000)
+    args = parser.parse_args()
+
+    for case, admid in ADMID_CASES.items():
+        mets_bytes = generate_mets(args.files, admid)
+        print('%-14s strings %6.2f MB   compact_idrefs %6.2f MB' % (
+            case, measure(mets_bytes), measure(mets_bytes, compact_idrefs=True)))
+
+    mets_bytes = generate_mets(args.files, ADMID_CASES['shared single'])
+    interned = measure(mets_bytes)
+    interned_attributes = dict(metsdoc.INTERNED_ATTRIBUTES)
+    metsdoc.INTERNED_ATTRIBUTES.clear()
+    try:
+        not_interned = measure(mets_bytes)
+    finally:
+        metsdoc.INTERNED_ATTRIBUTES.update(interned_attributes)
+    print('attribute interning: off %6.2f MB   on %6.2f MB' % (not_interned, interned))
+
+
+if __name__ == '__main__':
+    main()
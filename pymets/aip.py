@@ -0,0 +1,394 @@
+import hashlib
+import itertools
+import json
+import mimetypes
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from lxml.etree import xmlfile
+from pymets import NSMAP, XLINK, mets_structure
+
+# Map METS CHECKSUMTYPE values to hashlib algorithm names.
+CHECKSUM_ALGORITHMS = {
+    'MD5': 'md5',
+    'SHA-1': 'sha1',
+    'SHA-256': 'sha256',
+    'SHA-384': 'sha384',
+    'SHA-512': 'sha512',
+    }
+
+# Number of bytes read from a file at a time while hashing.
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Number of files hashed by each task given to the worker threads.
+HASH_CHUNK_SIZE = 64
+
+
+class AIPException(Exception):
+    """Base exception for building METS from a directory."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return "%s" % (self.value,)
+
+
+def scan_directory(path):
+    """Walk a directory without recursion, yielding a
+    (relative_path, size, mtime_ns) tuple for every file.
+
+    Entries are yielded in sorted, depth first order and relative paths
+    always use "/" as the separator. Symbolic links to directories are not
+    followed.
+    """
+    # Each stack entry holds a relative path, a filesystem path and, for
+    # files, the stat result.
+    stack = [('', path, None)]
+    while stack:
+        relative_path, entry_path, stat = stack.pop()
+        if stat is not None:
+            yield relative_path, stat.st_size, stat.st_mtime_ns
+            continue
+        try:
+            with os.scandir(entry_path) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+            prefix = relative_path + '/' if relative_path else ''
+            # Push in reverse so entries are popped in sorted order.
+            for entry in reversed(entries):
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((prefix + entry.name, entry.path, None))
+                elif entry.is_file():
+                    stack.append((prefix + entry.name, entry.path, entry.stat()))
+        except OSError as e:
+            raise AIPException("Failed to scan directory %s: %s" % (
+                relative_path or entry_path, e.strerror or e))
+
+
+def hash_file(path, checksum_type='MD5'):
+    """Return the hex digest of a file using a METS CHECKSUMTYPE."""
+    try:
+        algorithm = CHECKSUM_ALGORITHMS[checksum_type]
+    except KeyError:
+        raise AIPException("Checksum type %s is not supported." % (checksum_type,))
+    digest = hashlib.new(algorithm)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_checkpoint(checkpoint_filename, checksum_type):
+    """Read the checksums recorded in a checkpoint file.
+
+    Returns a dictionary mapping relative paths to (size, mtime_ns, checksum)
+    tuples. Lines left incomplete by an interrupted run, and checksums of a
+    different type, are ignored.
+    """
+    checksums = {}
+    if not os.path.exists(checkpoint_filename):
+        return checksums
+    with open(checkpoint_filename, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get('checksum_type') == checksum_type:
+                checksums[record['path']] = (
+                    record['size'], record['mtime_ns'], record['checksum'])
+    return checksums
+
+
+def hash_directory(path, checksum_type='MD5', workers=None, batch_size=1000,
+                   checkpoint_filename=None):
+    """Scan a directory and hash its files in parallel worker threads.
+
+    Yields (relative_path, size, checksum) tuples in the order produced by
+    scan_directory. Files are hashed batch_size at a time. If a checkpoint
+    filename is given, every checksum is appended to it as it is computed,
+    and files whose size and modification time match a checkpointed entry
+    are not hashed again.
+    """
+    if checksum_type not in CHECKSUM_ALGORITHMS:
+        raise AIPException("Checksum type %s is not supported." % (checksum_type,))
+    checkpointed = {}
+    checkpoint = None
+    if checkpoint_filename:
+        checkpointed = load_checkpoint(checkpoint_filename, checksum_type)
+        checkpoint = open(checkpoint_filename, 'a', encoding='utf-8')
+        # Terminate a line left incomplete by an interrupted run.
+        if checkpoint.tell() > 0:
+            with open(checkpoint_filename, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    checkpoint.write('\n')
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            batch = []
+            for scanned in scan_directory(path):
+                batch.append(scanned)
+                if len(batch) >= batch_size:
+                    yield from _hash_batch(path, batch, checksum_type, executor,
+                                           checkpointed, checkpoint)
+                    batch = []
+            yield from _hash_batch(path, batch, checksum_type, executor,
+                                   checkpointed, checkpoint)
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+
+
+def _hash_files(path, relative_paths, checksum_type):
+    """Hash a chunk of files in a worker thread."""
+    checksums = []
+    for relative_path in relative_paths:
+        try:
+            checksums.append(hash_file(os.path.join(path, relative_path), checksum_type))
+        except OSError as e:
+            raise AIPException(
+                "Failed to hash file %s: %s" % (relative_path, e.strerror or e))
+    return checksums
+
+
+def _get_checkpointed(checkpointed, relative_path, size, mtime_ns):
+    """Return the checkpointed checksum of an unchanged file, or None."""
+    previous = checkpointed.get(relative_path)
+    if previous is not None and previous[:2] == (size, mtime_ns):
+        return previous[2]
+    return None
+
+
+def _hash_batch(path, batch, checksum_type, executor, checkpointed, checkpoint):
+    """Hash a batch of scanned files, reusing checkpointed checksums.
+
+    Files are handed to the worker threads HASH_CHUNK_SIZE at a time, as
+    submitting a task per file costs more than hashing a small file.
+    """
+    to_hash = [
+        relative_path for relative_path, size, mtime_ns in batch
+        if _get_checkpointed(checkpointed, relative_path, size, mtime_ns) is None]
+    futures = [
+        executor.submit(_hash_files, path, to_hash[i:i + HASH_CHUNK_SIZE], checksum_type)
+        for i in range(0, len(to_hash), HASH_CHUNK_SIZE)]
+    hashed = itertools.chain.from_iterable(future.result() for future in futures)
+    for relative_path, size, mtime_ns in batch:
+        checksum = _get_checkpointed(checkpointed, relative_path, size, mtime_ns)
+        if checksum is None:
+            checksum = next(hashed)
+            if checkpoint is not None:
+                checkpoint.write(json.dumps({
+                    'path': relative_path, 'size': size, 'mtime_ns': mtime_ns,
+                    'checksum_type': checksum_type, 'checksum': checksum,
+                    }) + '\n')
+        yield relative_path, size, checksum
+    if checkpoint is not None:
+        checkpoint.flush()
+
+
+def build_mets(path, attributes=None, checksum_type='MD5', workers=None,
+               batch_size=1000, checkpoint_filename=None):
+    """Build a Mets object describing every file in a directory.
+
+    Each file gets a file element with an FLocat holding its relative path
+    in a single fileGrp. The structMap mirrors the directory tree, with a
+    div for each directory and file and an fptr pointing at each file.
+    Empty directories are not included.
+    """
+    mets = mets_structure.Mets(attributes=attributes or {})
+    file_grp = mets_structure.FileGrp()
+    file_sec = mets_structure.FileSec()
+    file_sec.add_child(file_grp)
+    root_div = mets_structure.Div(attributes={'TYPE': 'directory'})
+    struct_map = mets_structure.StructMap()
+    struct_map.add_child(root_div)
+    # Map relative directory paths to their divs.
+    directory_divs = {'': root_div}
+
+    hashed = hash_directory(path, checksum_type=checksum_type, workers=workers,
+                            batch_size=batch_size,
+                            checkpoint_filename=checkpoint_filename)
+    for count, (relative_path, size, checksum) in enumerate(hashed, start=1):
+        file_id = 'file_%05d' % (count,)
+        file_grp.add_child(
+            _create_file(file_id, relative_path, size, checksum, checksum_type))
+        directory, _, name = relative_path.rpartition('/')
+        parent_div = _get_directory_div(directory, directory_divs)
+        parent_div.add_child(_create_file_div(file_id, name))
+
+    mets.add_child(file_sec)
+    mets.add_child(struct_map)
+    return mets
+
+
+def _get_directory_div(directory, directory_divs):
+    """Return the div for a relative directory path, creating it and any
+    missing ancestors.
+    """
+    missing = []
+    while directory not in directory_divs:
+        missing.append(directory)
+        directory = directory.rpartition('/')[0]
+    div = directory_divs[directory]
+    for directory in reversed(missing):
+        child_div = mets_structure.Div(attributes={
+            'TYPE': 'directory',
+            'LABEL': directory.rpartition('/')[2],
+            })
+        div.add_child(child_div)
+        directory_divs[directory] = child_div
+        div = child_div
+    return div
+
+
+def _create_file(file_id, relative_path, size, checksum, checksum_type):
+    """Create the file element, with its FLocat, for a hashed file."""
+    mimetype = mimetypes.guess_type(relative_path)[0] or 'application/octet-stream'
+    mets_file = mets_structure.File(attributes={
+        'ID': file_id,
+        'MIMETYPE': mimetype,
+        'SIZE': str(size),
+        'CHECKSUM': checksum,
+        'CHECKSUMTYPE': checksum_type,
+        })
+    mets_file.add_child(mets_structure.FLocat(attributes={
+        'LOCTYPE': 'URL',
+        XLINK+'href': relative_path,
+        }))
+    return mets_file
+
+
+def _create_file_div(file_id, name):
+    """Create the structMap div, with its fptr, for a file."""
+    file_div = mets_structure.Div(attributes={'TYPE': 'file', 'LABEL': name})
+    file_div.add_child(mets_structure.Fptr(attributes={'FILEID': file_id}))
+    return file_div
+
+
+class _OpenElements(object):
+    """Elements open on an incremental XML writer.
+
+    Elements are started and ended explicitly, so nesting can follow the
+    scan order, and are written with two space indentation.
+    """
+
+    def __init__(self, xf):
+        self.xf = xf
+        # Each open element is an [ExitStack, has child elements] pair.
+        self.open = []
+
+    def __len__(self):
+        return len(self.open)
+
+    def start(self, tag, attrib, nsmap=None):
+        """Write a start tag, indented to its depth."""
+        if self.open:
+            self.open[-1][1] = True
+            self.xf.write('\n' + '  ' * len(self.open))
+        context = ExitStack()
+        context.enter_context(self.xf.element(tag, attrib, nsmap=nsmap))
+        self.open.append([context, False])
+
+    def end(self):
+        """Write the end tag of the innermost open element."""
+        context, has_children = self.open.pop()
+        if has_children:
+            self.xf.write('\n' + '  ' * len(self.open))
+        context.close()
+
+
+def _write_element(elements, element):
+    """Write a METS element wrapper, and its children, to the open elements."""
+    base = len(elements)
+    for node, parent, depth in element.walk():
+        while len(elements) > base + depth:
+            elements.end()
+        elements.start(node.tag, {
+            attribute: str(value) for attribute, value in node.atts.items() if value})
+        if node.content:
+            elements.xf.write(node.content)
+        if node.tag == "xmlData":
+            for child in node.children:
+                elements.xf.write(child)
+    while len(elements) > base:
+        elements.end()
+
+
+def _write_struct_map_divs(elements, relative_paths):
+    """Write the directory and file divs for files in scan order.
+
+    Since scan_directory yields each directory's files together, the divs
+    of the directories holding the current file are kept open and closed
+    as soon as a file outside of them is reached.
+    """
+    base = len(elements)
+    open_directories = []
+    for count, relative_path in enumerate(relative_paths, start=1):
+        directories = relative_path.split('/')
+        name = directories.pop()
+        common = 0
+        while (common < len(open_directories) and common < len(directories) and
+               open_directories[common] == directories[common]):
+            common += 1
+        while len(open_directories) > common:
+            open_directories.pop()
+            elements.end()
+        for directory in directories[common:]:
+            elements.start('div', {'TYPE': 'directory', 'LABEL': directory})
+            open_directories.append(directory)
+        _write_element(elements, _create_file_div('file_%05d' % (count,), name))
+    while len(elements) > base:
+        elements.end()
+
+
+def create_mets_file(path, mets_filename, attributes=None, checksum_type='MD5',
+                     workers=None, batch_size=1000, checkpoint_filename=None,
+                     nsmap=None):
+    """Write METS describing every file in a directory to a file.
+
+    The document matches the one made by build_mets, but it is streamed to
+    disk: each file element is written as soon as its file is hashed, and
+    the structMap is written afterwards from the list of relative paths,
+    which is the only per-file data held in memory. The file is written
+    under a temporary name and only replaces mets_filename on success.
+    """
+    if not nsmap:
+        nsmap = NSMAP
+    mets = mets_structure.Mets(attributes=attributes or {})
+    hashed = hash_directory(path, checksum_type=checksum_type, workers=workers,
+                            batch_size=batch_size,
+                            checkpoint_filename=checkpoint_filename)
+    relative_paths = []
+    # Write to a temporary file so a failed run leaves no truncated METS.
+    directory, name = os.path.split(os.path.abspath(mets_filename))
+    temp_filename = os.path.join(directory, '.%s.%d.tmp' % (name, os.getpid()))
+    try:
+        with xmlfile(temp_filename, encoding='UTF-8') as xf:
+            xf.write_declaration()
+            elements = _OpenElements(xf)
+            elements.start(mets.tag, {
+                attribute: str(value) for attribute, value in mets.atts.items()},
+                nsmap=nsmap)
+            elements.start('fileSec', {})
+            elements.start('fileGrp', {})
+            for count, (relative_path, size, checksum) in enumerate(hashed, start=1):
+                file_id = 'file_%05d' % (count,)
+                _write_element(elements, _create_file(
+                    file_id, relative_path, size, checksum, checksum_type))
+                relative_paths.append(relative_path)
+            elements.end()
+            elements.end()
+            elements.start('structMap', {})
+            elements.start('div', {'TYPE': 'directory'})
+            _write_struct_map_divs(elements, relative_paths)
+            elements.end()
+            elements.end()
+            elements.end()
+        os.replace(temp_filename, mets_filename)
+    except OSError as e:
+        raise AIPException(
+            "Failed to create METS file. Filename: %s, %s" % (mets_filename, str(e)))
+    finally:
+        if os.path.exists(temp_filename):
+            os.remove(temp_filename)
@@ -0,0 +1,301 @@
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+from lxml.etree import LxmlError, iterparse
+from pymets import XLINK, metsdoc
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    mtime_ns INTEGER NOT NULL,
+    objid TEXT
+);
+CREATE TABLE IF NOT EXISTS files (
+    document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    file_id TEXT,
+    checksum TEXT,
+    size INTEGER,
+    mimetype TEXT
+);
+CREATE TABLE IF NOT EXISTS flocats (
+    document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    file_id TEXT,
+    href TEXT
+);
+CREATE TABLE IF NOT EXISTS struct_maps (
+    document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    type TEXT
+);
+CREATE TABLE IF NOT EXISTS agents (
+    document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    name TEXT
+);
+CREATE TABLE IF NOT EXISTS failures (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS documents_objid ON documents(objid);
+CREATE INDEX IF NOT EXISTS files_document_id ON files(document_id);
+CREATE INDEX IF NOT EXISTS files_checksum ON files(checksum);
+CREATE INDEX IF NOT EXISTS flocats_document_id ON flocats(document_id);
+CREATE INDEX IF NOT EXISTS flocats_href ON flocats(href);
+CREATE INDEX IF NOT EXISTS struct_maps_document_id ON struct_maps(document_id);
+CREATE INDEX IF NOT EXISTS struct_maps_type ON struct_maps(type);
+CREATE INDEX IF NOT EXISTS agents_document_id ON agents(document_id);
+CREATE INDEX IF NOT EXISTS agents_name ON agents(name);
+"""
+
+
+def extract_fields(mets_filename):
+    """Parse a METS file and return the fields stored in the index.
+
+    Returns a dictionary holding the OBJID and lists of file, FLocat,
+    structMap and agent name rows. The fields are read straight from the
+    XML, so attributes and elements that pymets does not model are ignored
+    rather than rejected. Raises PymetsException if the file cannot be read
+    or is not a METS document.
+    """
+    fields = {
+        'objid': None,
+        'files': [],
+        'flocats': [],
+        'struct_maps': [],
+        'agents': [],
+        }
+    root = None
+    try:
+        for event, element in iterparse(mets_filename, events=('start', 'end')):
+            if root is None:
+                if element.tag != 'mets':
+                    break
+                root = element
+                fields['objid'] = element.get('OBJID')
+            if event == 'start':
+                continue
+            if element.tag == 'file':
+                fields['files'].append((
+                    element.get('ID'),
+                    element.get('CHECKSUM'),
+                    _parse_size(element.get('SIZE')),
+                    element.get('MIMETYPE'),
+                    ))
+            elif element.tag == 'FLocat':
+                fields['flocats'].append(
+                    (element.getparent().get('ID'), element.get(XLINK+'href')))
+            elif element.tag == 'structMap':
+                fields['struct_maps'].append((element.get('TYPE'),))
+            elif element.tag == 'name' and element.getparent().tag == 'agent':
+                fields['agents'].append((element.text.strip() if element.text else None,))
+            # Free the parsed elements that are no longer needed.
+            if element is not root:
+                element.clear()
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+    except (LxmlError, OSError) as e:
+        raise metsdoc.PymetsException(
+            "Failed to parse %s: %s" % (mets_filename, str(e)))
+    if root is None:
+        raise metsdoc.PymetsException(
+            "Failed to parse %s: no METS root element found." % (mets_filename,))
+    return fields
+
+
+def _parse_size(size):
+    """Return a SIZE attribute as an integer, or None if it is not one."""
+    try:
+        return int(size)
+    except (TypeError, ValueError):
+        return None
+
+
+def _extract_document(mets_filename):
+    """Run extract_fields in a worker process.
+
+    Returns a (fields, error) tuple, so a document that fails to parse is
+    reported with a message rather than stopping the whole update.
+    """
+    try:
+        return extract_fields(mets_filename), None
+    except metsdoc.PymetsException as e:
+        return None, str(e)
+
+
+class CorpusIndex(object):
+    """SQLite index of selected fields from a collection of METS files.
+
+    index = CorpusIndex('corpus.sqlite')
+    index.update(mets_filenames)
+    index.find_by_checksum('d41d8cd98f00b204e9800998ecf8427e')
+    """
+
+    def __init__(self, index_filename):
+        self.connection = sqlite3.connect(index_filename)
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Close the index database."""
+        self.connection.close()
+
+    def update(self, mets_filenames, workers=None, batch_size=500, prune=False):
+        """Index METS files that are new or modified since they were last
+        indexed, parsing them in parallel worker processes.
+
+        Each batch of batch_size documents is committed as it completes, so
+        an interrupted update keeps the work already done. Documents that
+        are missing or fail to parse are removed from the index and skipped.
+        Parse failures are recorded with the document's modification time,
+        and the document is not parsed again until that time changes; see
+        failures().
+
+        Indexed documents that are not in mets_filenames are left in the
+        index unless prune is True, in which case they are removed once all
+        of mets_filenames has been processed. Pass the whole corpus when
+        pruning, otherwise use remove() for documents deleted from disk.
+
+        Returns a tuple of the number of documents indexed and a list of
+        (path, error message) tuples for the documents that failed in this
+        update.
+        """
+        indexed = 0
+        failed = []
+        if prune:
+            self.connection.execute(
+                'CREATE TEMP TABLE IF NOT EXISTS seen_paths (path TEXT PRIMARY KEY)')
+            self.connection.execute('DELETE FROM seen_paths')
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            batch = []
+            for mets_filename in mets_filenames:
+                path = os.path.abspath(mets_filename)
+                try:
+                    mtime_ns = os.stat(path).st_mtime_ns
+                except OSError as e:
+                    self.remove(path)
+                    failed.append((path, "Failed to read %s: %s" % (path, e.strerror or e)))
+                    continue
+                if prune:
+                    self.connection.execute(
+                        'INSERT OR IGNORE INTO seen_paths (path) VALUES (?)', (path,))
+                if self._get_mtime_ns(path) != mtime_ns:
+                    batch.append((path, mtime_ns))
+                if len(batch) >= batch_size:
+                    indexed += self._index_batch(batch, executor, failed)
+                    batch = []
+            indexed += self._index_batch(batch, executor, failed)
+        if prune:
+            with self.connection:
+                self.connection.execute(
+                    'DELETE FROM documents WHERE path NOT IN (SELECT path FROM seen_paths)')
+                self.connection.execute(
+                    'DELETE FROM failures WHERE path NOT IN (SELECT path FROM seen_paths)')
+                self.connection.execute('DELETE FROM seen_paths')
+        return indexed, failed
+
+    def _get_mtime_ns(self, path):
+        """Return the modification time recorded for an indexed or failed
+        path, or None.
+        """
+        row = self.connection.execute(
+            'SELECT mtime_ns FROM documents WHERE path = ?'
+            ' UNION ALL SELECT mtime_ns FROM failures WHERE path = ?',
+            (path, path)).fetchone()
+        if row is not None:
+            return row[0]
+        return None
+
+    def _index_batch(self, batch, executor, failed):
+        """Parse a batch of documents and store their fields.
+
+        Documents that fail to parse are added to the failed list. Returns
+        the number of documents indexed.
+        """
+        indexed = 0
+        paths = [path for path, mtime_ns in batch]
+        results = executor.map(_extract_document, paths)
+        with self.connection:
+            for (path, mtime_ns), (fields, error) in zip(batch, results):
+                self.connection.execute('DELETE FROM documents WHERE path = ?', (path,))
+                if error is not None:
+                    self.connection.execute(
+                        'INSERT OR REPLACE INTO failures (path, mtime_ns, message)'
+                        ' VALUES (?, ?, ?)', (path, mtime_ns, error))
+                    failed.append((path, error))
+                    continue
+                self.connection.execute('DELETE FROM failures WHERE path = ?', (path,))
+                indexed += 1
+                document_id = self.connection.execute(
+                    'INSERT INTO documents (path, mtime_ns, objid) VALUES (?, ?, ?)',
+                    (path, mtime_ns, fields['objid'])).lastrowid
+                self.connection.executemany(
+                    'INSERT INTO files (document_id, file_id, checksum, size, mimetype)'
+                    ' VALUES (?, ?, ?, ?, ?)',
+                    [(document_id,) + row for row in fields['files']])
+                self.connection.executemany(
+                    'INSERT INTO flocats (document_id, file_id, href) VALUES (?, ?, ?)',
+                    [(document_id,) + row for row in fields['flocats']])
+                self.connection.executemany(
+                    'INSERT INTO struct_maps (document_id, type) VALUES (?, ?)',
+                    [(document_id,) + row for row in fields['struct_maps']])
+                self.connection.executemany(
+                    'INSERT INTO agents (document_id, name) VALUES (?, ?)',
+                    [(document_id,) + row for row in fields['agents']])
+        return indexed
+
+    def remove(self, mets_filename):
+        """Remove a METS file, or its recorded failure, from the index."""
+        path = os.path.abspath(mets_filename)
+        with self.connection:
+            self.connection.execute('DELETE FROM documents WHERE path = ?', (path,))
+            self.connection.execute('DELETE FROM failures WHERE path = ?', (path,))
+
+    def failures(self):
+        """Return (path, error message) tuples for documents that failed to
+        parse and have not changed since.
+        """
+        return self.connection.execute(
+            'SELECT path, message FROM failures ORDER BY path').fetchall()
+
+    def _find(self, table, column, value):
+        """Return (path, OBJID) tuples for documents with a matching row."""
+        return self.connection.execute(
+            'SELECT path, objid FROM documents WHERE id IN'
+            ' (SELECT document_id FROM %s WHERE %s = ?) ORDER BY path' % (table, column),
+            (value,)).fetchall()
+
+    def find_by_checksum(self, checksum):
+        """Return (path, OBJID) tuples for documents containing a file
+        with the checksum.
+        """
+        return self._find('files', 'checksum', checksum)
+
+    def find_by_href(self, href):
+        """Return (path, OBJID) tuples for documents with an FLocat
+        referencing the href.
+        """
+        return self._find('flocats', 'href', href)
+
+    def find_by_struct_map_type(self, struct_map_type):
+        """Return (path, OBJID) tuples for documents with a structMap of
+        the TYPE.
+        """
+        return self._find('struct_maps', 'type', struct_map_type)
+
+    def find_by_agent_name(self, name):
+        """Return (path, OBJID) tuples for documents with an agent of the
+        name.
+        """
+        return self._find('agents', 'name', name)
+
+    def find_by_objid(self, objid):
+        """Return the paths of documents with the OBJID."""
+        return [row[0] for row in self.connection.execute(
+            'SELECT path FROM documents WHERE objid = ? ORDER BY path', (objid,))]
@@ -1,3 +1,5 @@
+import sys
+
 from lxml.etree import Element, SubElement, tostring
 from pymets import XLINK, XSI, NSMAP
 
@@ -12,23 +14,46 @@ class MetsStructureException(Exception):
         return "%s" % (self.value,)
 
 
+class IDRefs(tuple):
+    """Compact representation of an IDREFS attribute value such as ADMID or DMDID.
+
+    The space separated list of IDs is held as a tuple of interned strings, so
+    IDs shared by many elements are only stored once. It serializes back to
+    the space separated form through str().
+    """
+    __slots__ = ()
+
+    def __new__(cls, value=()):
+        if isinstance(value, str):
+            value = value.split()
+        return super(IDRefs, cls).__new__(cls, (sys.intern(ref) for ref in value))
+
+    def __str__(self):
+        return ' '.join(self)
+
+
 def create_mets_xml_subelement(parent, element):
     """Create METS sub elements."""
-    sub_element = SubElement(parent, element.tag)
-    for attribute, value in element.atts.items():
-        if not value:
-            continue
-        if not isinstance(value, str):
-            sub_element.set(attribute, str(value))
-        else:
-            sub_element.set(attribute, value)
-    if element.content:
-        sub_element.text = element.content
-    for child in element.children:
-        if element.tag == "xmlData":
-            sub_element.append(child)
+    # Map each wrapper visited to the XML element created for it.
+    sub_elements = {}
+    for node, node_parent, depth in element.walk():
+        if node_parent is None:
+            sub_element = SubElement(parent, node.tag)
         else:
-            create_mets_xml_subelement(sub_element, child)
+            sub_element = SubElement(sub_elements[id(node_parent)], node.tag)
+        sub_elements[id(node)] = sub_element
+        for attribute, value in node.atts.items():
+            if not value:
+                continue
+            if not isinstance(value, str):
+                sub_element.set(attribute, str(value))
+            else:
+                sub_element.set(attribute, value)
+        if node.content:
+            sub_element.text = node.content
+        if node.tag == "xmlData":
+            for child in node.children:
+                sub_element.append(child)
 
 
 class MetsBase(object):
@@ -125,6 +150,46 @@ class MetsBase(object):
                 childList.append(child)
         return childList
 
+    def walk(self, order='pre', prune=None):
+        """Traverse this element and all of its descendants without recursion.
+
+        Yields (element, parent, depth) tuples, where parent is None and
+        depth is 0 for the element walk was called on. Elements are yielded
+        in document order when order is 'pre', or after their descendants
+        when order is 'post'. If prune is given, it is called with each
+        element and the element's descendants are skipped when it returns
+        True. The arbitrary XML held by xmlData elements is not traversed.
+        """
+        if order not in ('pre', 'post'):
+            raise MetsStructureException(
+                "Invalid traversal order %s." % (order,))
+        # Each stack entry holds an element, its parent, its depth and
+        # whether its children have already been pushed.
+        stack = [(self, None, 0, False)]
+        while stack:
+            element, parent, depth, expanded = stack.pop()
+            if expanded:
+                yield element, parent, depth
+                continue
+            if order == 'pre':
+                yield element, parent, depth
+            else:
+                stack.append((element, parent, depth, True))
+            if element.tag == "xmlData":
+                continue
+            if prune is not None and prune(element):
+                continue
+            for child in reversed(element.children):
+                stack.append((child, element, depth + 1, False))
+
+    def iter(self, tag=None):
+        """Iterate over this element and all of its descendants in document
+        order, optionally only returning those that match the tag.
+        """
+        for element, parent, depth in self.walk():
+            if tag is None or element.tag == tag:
+                yield element
+
     def set_content(self, content):
         """Set textual content for the object/node.  It checks to make
         sure that the node is allowed to contain content and throws an
@@ -368,7 +433,7 @@ class StructMap(MetsBase):
     contained_children = ["div"]
 
     def __init__(self, **kwargs):
-        self.atts = {"ID": None}
+        self.atts = {"ID": None, "TYPE": None, "LABEL": None}
         super(StructMap, self).__init__(**kwargs)
 
 
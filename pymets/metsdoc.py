@@ -1,5 +1,7 @@
+import sys
+
 from lxml.etree import iterparse
-from pymets import mets_structure
+from pymets import XLINK, mets_structure
 
 
 class PymetsException(Exception):
@@ -55,13 +57,71 @@ PYMETS_DISPATCH = {
     }
 
 
-def metsxml2py(mets_filename, loose=False):
+# Low cardinality attributes, by element tag, whose values are interned
+# during parsing so that repeated values share a single string.
+INTERNED_ATTRIBUTES = {
+    'mets': ('TYPE',),
+    'metsHdr': ('RECORDSTATUS',),
+    'agent': ('ROLE', 'TYPE'),
+    'altRecordID': ('TYPE',),
+    'metsDocumentID': ('TYPE',),
+    'mdRef': ('LOCTYPE', 'MDTYPE', 'OTHERMDTYPE'),
+    'mdWrap': ('MDTYPE',),
+    'file': ('MIMETYPE', 'USE', 'CHECKSUMTYPE'),
+    'FLocat': ('LOCTYPE',),
+    'structMap': ('TYPE',),
+    'div': ('TYPE',),
+    'area': ('SHAPE', 'BETYPE', 'EXTYPE'),
+    'smLink': (XLINK+'arcrole', XLINK+'actuate'),
+    'behavior': ('BTYPE',),
+    'interfaceDef': ('LOCTYPE', 'OTHERLOCTYPE'),
+    'mechanism': ('LOCTYPE', 'OTHERLOCTYPE'),
+    }
+
+# IDREFS attributes that can be stored in compact form.
+IDREFS_ATTRIBUTES = ('ADMID', 'DMDID')
+
+
+def get_attributes(tag, attrib, idrefs=None):
+    """Copy an element's attributes into a dictionary, interning the
+    values listed for the tag in INTERNED_ATTRIBUTES.
+
+    If an idrefs dictionary is given, IDREFS attribute values are stored in
+    compact form: every element with the same value shares one string for a
+    single ID, or one mets_structure.IDRefs for a list of IDs.
+    The dictionary caches the compact values and is reused for a whole
+    document. This saves memory when values repeat, but a list of IDs used
+    by only one element takes more memory as an IDRefs than as a string
+    (see benchmarks/parse_memory.py).
+    """
+    attributes = dict(attrib)
+    for name in INTERNED_ATTRIBUTES.get(tag, ()):
+        if name in attributes:
+            attributes[name] = sys.intern(attributes[name])
+    if idrefs is not None:
+        for name in IDREFS_ATTRIBUTES:
+            if name in attributes:
+                value = attributes[name]
+                if value not in idrefs:
+                    refs = value.split()
+                    idrefs[value] = value if len(refs) == 1 else mets_structure.IDRefs(refs)
+                attributes[name] = idrefs[value]
+    return attributes
+
+
+def metsxml2py(mets_filename, loose=False, compact_idrefs=False):
     """Take a METS XML filename and parse it into a Python object.
 
     You can also pass this a string as input like so:
        import io
        metsxml2py(io.BytesIO(mets_string.encode('utf-8'))
+
+    Repeated low cardinality attribute values are interned while parsing.
+    If compact_idrefs is True, ADMID and DMDID values are stored in the
+    compact form described in get_attributes.
     """
+    # Compact IDREFS values already seen in this document.
+    idrefs = {} if compact_idrefs else None
     # Create a stack to hold parents.
     parent_stack = []
     # Use the memory efficient iterparse to open the file and loop through elements.
@@ -79,7 +139,8 @@ def metsxml2py(mets_filename, loose=False):
                     # Add the element to the parent stack.
                     parent_stack.append(
                         PYMETS_DISPATCH[element.tag](
-                            attributes=element.attrib,
+                            attributes=get_attributes(
+                                element.tag, element.attrib, idrefs),
                             content=element.text,
                             )
                         )
@@ -87,7 +148,10 @@ def metsxml2py(mets_filename, loose=False):
                 elif len(element.attrib) > 0:
                     # Add the element to the parent stack.
                     parent_stack.append(
-                        PYMETS_DISPATCH[element.tag](attributes=element.attrib)
+                        PYMETS_DISPATCH[element.tag](
+                            attributes=get_attributes(
+                                element.tag, element.attrib, idrefs),
+                            )
                         )
                 # If the element has content.
                 elif content != '':
@@ -0,0 +1,162 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from pymets import XLINK, aip, metsdoc
+
+
+class AIPTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        for relative_path, data in (('b.txt', b'b'),
+                                    ('a/page_1.tif', b'page 1'),
+                                    ('a/c/page_2.tif', b'page 2'),
+                                    ('z.txt', b'z')):
+            path = os.path.join(self.directory, *relative_path.split('/'))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(data)
+        os.mkdir(os.path.join(self.directory, 'empty'))
+
+    def test_scan_directory(self):
+        scanned = [(p, size) for p, size, mtime_ns in aip.scan_directory(self.directory)]
+        self.assertEqual(scanned, [
+            ('a/c/page_2.tif', 6), ('a/page_1.tif', 6), ('b.txt', 1), ('z.txt', 1),
+        ])
+
+    def test_scan_directory_missing_directory(self):
+        missing = os.path.join(self.directory, 'missing')
+        with self.assertRaises(aip.AIPException) as cm:
+            list(aip.scan_directory(missing))
+
+        expected_error = 'Failed to scan directory %s: No such file or directory' % (missing,)
+        self.assertEqual(str(cm.exception), expected_error)
+
+    def test_hash_file_invalid_checksum_type(self):
+        with self.assertRaises(aip.AIPException) as cm:
+            aip.hash_file(os.path.join(self.directory, 'b.txt'), 'CRC32')
+
+        expected_error = 'Checksum type CRC32 is not supported.'
+        self.assertEqual(str(cm.exception), expected_error)
+
+    def test_hash_directory(self):
+        hashed = list(aip.hash_directory(self.directory, checksum_type='SHA-256',
+                                         batch_size=3))
+        self.assertEqual(hashed[2], ('b.txt', 1, hashlib.sha256(b'b').hexdigest()))
+        self.assertEqual(len(hashed), 4)
+
+    def test_hash_directory_resumes_from_checkpoint(self):
+        checkpoint_filename = os.path.join(tempfile.mkdtemp(), 'checkpoint.jsonl')
+        self.addCleanup(shutil.rmtree, os.path.dirname(checkpoint_filename))
+        first = list(aip.hash_directory(self.directory,
+                                        checkpoint_filename=checkpoint_filename))
+        # Simulate a run interrupted while writing a checkpoint line.
+        with open(checkpoint_filename, 'a') as f:
+            f.write('{"path": "z.t')
+
+        hashed = []
+        original_hash_file = aip.hash_file
+        aip.hash_file = lambda path, checksum_type: hashed.append(path)
+        try:
+            second = list(aip.hash_directory(self.directory,
+                                             checkpoint_filename=checkpoint_filename))
+        finally:
+            aip.hash_file = original_hash_file
+        self.assertEqual(hashed, [])
+        self.assertEqual(first, second)
+        with open(checkpoint_filename) as f:
+            self.assertEqual(f.read().split('\n')[-2:], ['{"path": "z.t', ''])
+
+    def test_hash_directory_unreadable_file(self):
+        original_hash_file = aip.hash_file
+
+        def remove_and_hash(path, checksum_type):
+            if path.endswith('b.txt'):
+                os.remove(path)
+            return original_hash_file(path, checksum_type)
+
+        aip.hash_file = remove_and_hash
+        try:
+            with self.assertRaises(aip.AIPException) as cm:
+                list(aip.hash_directory(self.directory, workers=1))
+        finally:
+            aip.hash_file = original_hash_file
+
+        expected_error = 'Failed to hash file b.txt: No such file or directory'
+        self.assertEqual(str(cm.exception), expected_error)
+
+    def test_build_mets(self):
+        m = aip.build_mets(self.directory, attributes={'OBJID': 'ark:/67531/12345'})
+        m = metsdoc.metsxml2py(io.BytesIO(m.create_xml_string()))
+
+        files = list(m.iter('file'))
+        self.assertEqual(len(files), 4)
+        self.assertEqual(files[0].get_att('ID'), 'file_00001')
+        self.assertEqual(files[0].get_att('MIMETYPE'), 'image/tiff')
+        self.assertEqual(files[0].get_att('CHECKSUM'), hashlib.md5(b'page 2').hexdigest())
+        self.assertEqual(files[0].children[0].get_att(XLINK+'href'), 'a/c/page_2.tif')
+
+        labels = [(div.get_att('TYPE'), div.get_att('LABEL'), depth)
+                  for div, parent, depth in m.walk() if div.tag == 'div']
+        self.assertEqual(labels, [
+            ('directory', None, 2),
+            ('directory', 'a', 3),
+            ('directory', 'c', 4),
+            ('file', 'page_2.tif', 5),
+            ('file', 'page_1.tif', 4),
+            ('file', 'b.txt', 3),
+            ('file', 'z.txt', 3),
+        ])
+        fileids = [fptr.get_att('FILEID') for fptr in m.iter('fptr')]
+        self.assertEqual(fileids, ['file_00001', 'file_00002', 'file_00003', 'file_00004'])
+
+    def test_create_mets_file_failure_leaves_no_file(self):
+        output_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_directory)
+        mets_filename = os.path.join(output_directory, 'mets.xml')
+        original_hash_file = aip.hash_file
+
+        def failing_hash_file(path, checksum_type):
+            if path.endswith('b.txt'):
+                raise FileNotFoundError(2, 'No such file or directory')
+            return original_hash_file(path, checksum_type)
+
+        aip.hash_file = failing_hash_file
+        try:
+            with self.assertRaises(aip.AIPException):
+                aip.create_mets_file(self.directory, mets_filename, batch_size=1)
+        finally:
+            aip.hash_file = original_hash_file
+        self.assertEqual(os.listdir(output_directory), [])
+
+    def test_create_mets_file_matches_build_mets(self):
+        attributes = {'OBJID': 'ark:/67531/12345'}
+        mets_filename = os.path.join(tempfile.mkdtemp(), 'mets.xml')
+        self.addCleanup(shutil.rmtree, os.path.dirname(mets_filename))
+        aip.create_mets_file(self.directory, mets_filename, attributes=attributes,
+                             batch_size=2)
+
+        built = aip.build_mets(self.directory, attributes=attributes)
+        built = metsdoc.metsxml2py(io.BytesIO(built.create_xml_string()))
+        streamed = metsdoc.metsxml2py(mets_filename)
+        with open(mets_filename, 'rb') as f:
+            self.assertEqual(f.read().count(b'xmlns:xlink='), 1)
+        self.assertEqual(
+            [(e.tag, e.atts, depth) for e, parent, depth in streamed.walk()],
+            [(e.tag, e.atts, depth) for e, parent, depth in built.walk()])
+
+
+def suite():
+    all_tests = unittest.TestSuite()
+    all_tests.addTest(unittest.makeSuite(AIPTests))
+
+    return all_tests
+
+
+if __name__ == '__main__':
+    unittest.main()
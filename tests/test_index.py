@@ -0,0 +1,189 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from pymets import index, metsdoc
+
+METS_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<mets xmlns:xlink="http://www.w3.org/1999/xlink" OBJID="%(objid)s">
+  <metsHdr>
+    <agent TYPE="ORGANIZATION" ROLE="CREATOR">
+      <name>UNT Libraries</name>
+    </agent>
+  </metsHdr>
+  <fileSec>
+    <fileGrp>
+      <file ID="file_1" CHECKSUM="%(checksum)s" CHECKSUMTYPE="MD5" SIZE="10"
+            MIMETYPE="image/tiff">
+        <FLocat LOCTYPE="URL" xlink:href="%(href)s"/>
+      </file>
+    </fileGrp>
+  </fileSec>
+  <structMap TYPE="%(type)s">
+    <div><fptr FILEID="file_1"/></div>
+  </structMap>
+</mets>
+"""
+
+
+class CorpusIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.index = index.CorpusIndex(os.path.join(self.directory, 'index.sqlite'))
+        self.addCleanup(self.index.close)
+
+    def write_mets(self, name, objid, checksum, href, struct_map_type='physical'):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as f:
+            f.write(METS_TEMPLATE % {
+                'objid': objid, 'checksum': checksum, 'href': href,
+                'type': struct_map_type,
+            })
+        return path
+
+    def test_extract_fields(self):
+        path = self.write_mets('a.xml', 'ark:/67531/a', 'abc', 'a/1.tif')
+        fields = index.extract_fields(path)
+        self.assertEqual(fields, {
+            'objid': 'ark:/67531/a',
+            'files': [('file_1', 'abc', 10, 'image/tiff')],
+            'flocats': [('file_1', 'a/1.tif')],
+            'struct_maps': [('physical',)],
+            'agents': [('UNT Libraries',)],
+        })
+
+    def test_extract_fields_unmodeled_attributes(self):
+        path = self.write_mets('a.xml', 'ark:/67531/a', 'abc', 'a/1.tif')
+        with open(path) as f:
+            mets_string = f.read()
+        mets_string = mets_string.replace('<fileGrp>', '<fileGrp USE="master">')
+        mets_string = mets_string.replace('<file ID="file_1"', '<file ID="file_1" GROUPID="g1"')
+        mets_string = mets_string.replace('<FLocat ', '<FLocat xlink:type="simple" ')
+        with open(path, 'w') as f:
+            f.write(mets_string)
+
+        fields = index.extract_fields(path)
+        self.assertEqual(fields['files'], [('file_1', 'abc', 10, 'image/tiff')])
+        self.assertEqual(fields['flocats'], [('file_1', 'a/1.tif')])
+
+    def test_extract_fields_invalid_size(self):
+        path = self.write_mets('a.xml', 'ark:/67531/a', 'abc', 'a/1.tif')
+        with open(path) as f:
+            mets_string = f.read().replace('SIZE="10"', 'SIZE="10.0"')
+        with open(path, 'w') as f:
+            f.write(mets_string)
+
+        self.assertEqual(index.extract_fields(path)['files'],
+                         [('file_1', 'abc', None, 'image/tiff')])
+
+    def test_extract_fields_malformed_document(self):
+        path = os.path.join(self.directory, 'malformed.xml')
+        with open(path, 'w') as f:
+            f.write('<mets><fileSec>')
+
+        with self.assertRaises(metsdoc.PymetsException) as cm:
+            index.extract_fields(path)
+        self.assertTrue(str(cm.exception).startswith('Failed to parse %s: ' % (path,)))
+
+    def test_extract_fields_namespaced_document(self):
+        path = os.path.join(self.directory, 'namespaced.xml')
+        with open(path, 'w') as f:
+            f.write('<mets xmlns="http://www.loc.gov/METS/"><metsHdr/></mets>')
+
+        with self.assertRaises(metsdoc.PymetsException) as cm:
+            index.extract_fields(path)
+        expected_error = 'Failed to parse %s: no METS root element found.' % (path,)
+        self.assertEqual(str(cm.exception), expected_error)
+
+    def test_update_reports_failed_documents(self):
+        a = self.write_mets('a.xml', 'ark:/67531/a', 'abc', 'a/1.tif')
+        malformed = os.path.join(self.directory, 'malformed.xml')
+        with open(malformed, 'w') as f:
+            f.write('<mets><fileSec>')
+        namespaced = os.path.join(self.directory, 'namespaced.xml')
+        with open(namespaced, 'w') as f:
+            f.write('<mets xmlns="http://www.loc.gov/METS/"><metsHdr/></mets>')
+        missing = os.path.join(self.directory, 'missing.xml')
+
+        indexed, failed = self.index.update([malformed, a, missing, namespaced], workers=2)
+        self.assertEqual(indexed, 1)
+        self.assertEqual([path for path, error in failed], [missing, malformed, namespaced])
+        self.assertEqual(failed[0][1], 'Failed to read %s: No such file or directory' % (missing,))
+        self.assertEqual(self.index.find_by_checksum('abc'), [(a, 'ark:/67531/a')])
+
+    def test_update_skips_unchanged_failures(self):
+        malformed = os.path.join(self.directory, 'malformed.xml')
+        with open(malformed, 'w') as f:
+            f.write('<mets><fileSec>')
+        indexed, failed = self.index.update([malformed], workers=1)
+        self.assertEqual(self.index.failures(), failed)
+
+        self.assertEqual(self.index.update([malformed], workers=1), (0, []))
+        self.assertEqual(len(self.index.failures()), 1)
+
+        self.write_mets('malformed.xml', 'ark:/67531/a', 'abc', 'a/1.tif')
+        stat = os.stat(malformed)
+        os.utime(malformed, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+        self.assertEqual(self.index.update([malformed], workers=1), (1, []))
+        self.assertEqual(self.index.failures(), [])
+
+    def test_queries(self):
+        a = self.write_mets('a.xml', 'ark:/67531/a', 'abc', 'a/1.tif')
+        b = self.write_mets('b.xml', 'ark:/67531/b', 'abc', 'b/1.tif', 'logical')
+        self.assertEqual(self.index.update([a, b], workers=2, batch_size=1), (2, []))
+
+        self.assertEqual(self.index.find_by_checksum('abc'),
+                         [(a, 'ark:/67531/a'), (b, 'ark:/67531/b')])
+        self.assertEqual(self.index.find_by_href('b/1.tif'), [(b, 'ark:/67531/b')])
+        self.assertEqual(self.index.find_by_struct_map_type('logical'),
+                         [(b, 'ark:/67531/b')])
+        self.assertEqual(len(self.index.find_by_agent_name('UNT Libraries')), 2)
+        self.assertEqual(self.index.find_by_objid('ark:/67531/a'), [a])
+        self.assertEqual(self.index.find_by_checksum('missing'), [])
+
+    def test_incremental_update(self):
+        a = self.write_mets('a.xml', 'ark:/67531/a', 'abc', 'a/1.tif')
+        b = self.write_mets('b.xml', 'ark:/67531/b', 'def', 'b/1.tif')
+        self.assertEqual(self.index.update([a, b], workers=1), (2, []))
+        self.assertEqual(self.index.update([a, b], workers=1), (0, []))
+
+        self.write_mets('a.xml', 'ark:/67531/a', 'ghi', 'a/1.tif')
+        stat = os.stat(a)
+        os.utime(a, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+        self.assertEqual(self.index.update([a, b], workers=1), (1, []))
+        self.assertEqual(self.index.find_by_checksum('abc'), [])
+        self.assertEqual(self.index.find_by_checksum('ghi'), [(a, 'ark:/67531/a')])
+
+    def test_update_prune(self):
+        a = self.write_mets('a.xml', 'ark:/67531/a', 'abc', 'a/1.tif')
+        b = self.write_mets('b.xml', 'ark:/67531/b', 'def', 'b/1.tif')
+        self.index.update([a, b], workers=1)
+
+        self.assertEqual(self.index.update([a], workers=1), (0, []))
+        self.assertEqual(self.index.find_by_objid('ark:/67531/b'), [b])
+
+        self.assertEqual(self.index.update([a], workers=1, prune=True), (0, []))
+        self.assertEqual(self.index.find_by_objid('ark:/67531/b'), [])
+        self.assertEqual(self.index.find_by_checksum('def'), [])
+        self.assertEqual(self.index.find_by_objid('ark:/67531/a'), [a])
+
+    def test_remove(self):
+        a = self.write_mets('a.xml', 'ark:/67531/a', 'abc', 'a/1.tif')
+        self.index.update([a], workers=1)
+        self.index.remove(a)
+        self.assertEqual(self.index.find_by_checksum('abc'), [])
+        self.assertEqual(self.index.find_by_objid('ark:/67531/a'), [])
+
+
+def suite():
+    all_tests = unittest.TestSuite()
+    all_tests.addTest(unittest.makeSuite(CorpusIndexTests))
+
+    return all_tests
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,4 @@
+import sys
 import unittest
 
 from pymets import mets_structure
@@ -79,6 +80,74 @@ class METSStructureTests(unittest.TestCase):
                          b'</mets>\n')
         self.assertEqual(m.create_xml_string(), expected_text)
 
+    def test_IDRefs(self):
+        refs = mets_structure.IDRefs('amd_1  amd_2')
+        self.assertEqual(refs, ('amd_1', 'amd_2'))
+        self.assertEqual(str(refs), 'amd_1 amd_2')
+        self.assertIs(refs[0], mets_structure.IDRefs(['amd_1'])[0])
+        self.assertFalse(hasattr(refs, '__dict__'))
+
+    def build_struct_map(self):
+        struct_map = mets_structure.StructMap()
+        book = mets_structure.Div(attributes={'TYPE': 'book'})
+        struct_map.add_child(book)
+        for order in ('1', '2'):
+            page = mets_structure.Div(attributes={'TYPE': 'page', 'ORDER': order})
+            page.add_child(mets_structure.Fptr(attributes={'FILEID': 'file_' + order}))
+            book.add_child(page)
+        return struct_map
+
+    def test_walk_pre_order(self):
+        struct_map = self.build_struct_map()
+        walked = [(e.tag, p.tag if p else None, d) for e, p, d in struct_map.walk()]
+        self.assertEqual(walked, [
+            ('structMap', None, 0),
+            ('div', 'structMap', 1),
+            ('div', 'div', 2),
+            ('fptr', 'div', 3),
+            ('div', 'div', 2),
+            ('fptr', 'div', 3),
+        ])
+
+    def test_walk_post_order(self):
+        struct_map = self.build_struct_map()
+        walked = [(e.tag, d) for e, p, d in struct_map.walk(order='post')]
+        self.assertEqual(walked, [
+            ('fptr', 3), ('div', 2), ('fptr', 3), ('div', 2), ('div', 1), ('structMap', 0),
+        ])
+
+    def test_walk_prune(self):
+        struct_map = self.build_struct_map()
+        walked = [e.tag for e, p, d in
+                  struct_map.walk(prune=lambda e: e.get_att('TYPE') == 'page')]
+        self.assertEqual(walked, ['structMap', 'div', 'div', 'div'])
+
+    def test_walk_invalid_order(self):
+        with self.assertRaises(mets_structure.MetsStructureException) as cm:
+            list(mets_structure.StructMap().walk(order='inorder'))
+
+        expected_error = 'Invalid traversal order inorder.'
+        self.assertEqual(str(cm.exception), expected_error)
+
+    def test_iter(self):
+        struct_map = self.build_struct_map()
+        self.assertEqual(len(list(struct_map.iter())), 6)
+        file_ids = [f.get_att('FILEID') for f in struct_map.iter('fptr')]
+        self.assertEqual(file_ids, ['file_1', 'file_2'])
+
+    def test_create_xml_string_deep_tree(self):
+        """Test serializing a tree deeper than the recursion limit."""
+        m = mets_structure.Mets()
+        struct_map = mets_structure.StructMap()
+        m.add_child(struct_map)
+        parent = struct_map
+        for _ in range(sys.getrecursionlimit() + 100):
+            div = mets_structure.Div()
+            parent.add_child(div)
+            parent = div
+
+        self.assertEqual(m.create_xml_string().count(b'<div/>'), 1)
+
 
 def suite():
     all_tests = unittest.TestSuite()
@@ -16,6 +16,47 @@ class METSDocTests(unittest.TestCase):
         expected_error = 'Element "metsHDR" not found in mets dispatch.'
         self.assertEqual(str(cm.exception), expected_error)
 
+    def test_repeated_attribute_values_are_interned(self):
+        mets_string = b"""<?xml version="1.0" encoding="UTF-8"?>
+        <mets><fileSec><fileGrp>
+          <file ID="file_1" MIMETYPE="image/tiff" USE="archive"/>
+          <file ID="file_2" MIMETYPE="image/tiff" USE="archive"/>
+        </fileGrp></fileSec></mets>"""
+
+        m = metsdoc.metsxml2py(io.BytesIO(mets_string))
+        file_1, file_2 = m.children[0].children[0].children
+        self.assertIs(file_1.get_att('MIMETYPE'), file_2.get_att('MIMETYPE'))
+        self.assertIs(file_1.get_att('USE'), file_2.get_att('USE'))
+
+    def test_compact_idrefs(self):
+        mets_string = b"""<?xml version="1.0" encoding="UTF-8"?>
+        <mets><structMap><div DMDID="dmd_1 dmd_2" TYPE="page"/></structMap></mets>"""
+
+        m = metsdoc.metsxml2py(io.BytesIO(mets_string), compact_idrefs=True)
+        div = m.children[0].children[0]
+        self.assertEqual(div.get_att('DMDID'), ('dmd_1', 'dmd_2'))
+        self.assertIn(b'DMDID="dmd_1 dmd_2"', m.create_xml_string())
+
+    def test_compact_idrefs_are_shared(self):
+        mets_string = b"""<?xml version="1.0" encoding="UTF-8"?>
+        <mets><structMap>
+          <div DMDID="dmd_1" ADMID="amd_1 amd_2"/>
+          <div DMDID="dmd_1" ADMID="amd_1 amd_2"/>
+        </structMap></mets>"""
+
+        m = metsdoc.metsxml2py(io.BytesIO(mets_string), compact_idrefs=True)
+        div_1, div_2 = m.children[0].children
+        self.assertEqual(div_1.get_att('DMDID'), 'dmd_1')
+        self.assertIs(div_1.get_att('DMDID'), div_2.get_att('DMDID'))
+        self.assertIs(div_1.get_att('ADMID'), div_2.get_att('ADMID'))
+
+    def test_idrefs_are_strings_by_default(self):
+        mets_string = b"""<?xml version="1.0" encoding="UTF-8"?>
+        <mets><structMap><div DMDID="dmd_1 dmd_2"/></structMap></mets>"""
+
+        m = metsdoc.metsxml2py(io.BytesIO(mets_string))
+        self.assertEqual(m.children[0].children[0].get_att('DMDID'), 'dmd_1 dmd_2')
+
 
 def suite():
     all_tests = unittest.TestSuite()